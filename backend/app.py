@@ -27,24 +27,61 @@
 #   along with this project. If not, see <https://www.gnu.org/licenses/>.                                    
 
 import os
-import re
+import hmac
 import json
+import string
+import queue
 import sqlite3
+import threading
 import datetime as dt
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from io import StringIO
 import csv
 
 from flask import (
-    Flask, request, jsonify, send_from_directory, Response
+    Flask, request, send_from_directory, Response, stream_with_context
 )
 
+# orjson is optional; fall back to stdlib json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(raw):
+    """Parse JSON from str or bytes, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # e.g. integers beyond 64 bits; let stdlib decide
+    return json.loads(raw)
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits; let stdlib decide
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_response(obj, status: int = 200) -> Response:
+    """jsonify() replacement that serializes with _json_dumps."""
+    return Response(_json_dumps(obj), status=status, mimetype="application/json")
+
 # ------------------------------------------------------------------------------
 # Paths / Config
 # ------------------------------------------------------------------------------
 MANIFEST_FILE = os.environ.get("MCQ_MANIFEST", str(Path(__file__).resolve().parent.parent / "mcq-manifest.json"))
 try:
-    _M = json.loads(Path(MANIFEST_FILE).read_text(encoding="utf-8"))
+    _M = _json_loads(Path(MANIFEST_FILE).read_bytes())
 except Exception:
     _M = {}
 
@@ -103,24 +140,110 @@ app = Flask(__name__, static_folder=None)
 # ======================================================================
 """SQLite connection and schema helpers."""
 
-def _connect():
-    cx = sqlite3.connect(DB_PATH)
-    cx.row_factory = sqlite3.Row
-    return cx
+# Applied once to every pooled connection (journal_mode=WAL is persistent in the
+# database file, so _ensure_db() sets it once per process instead)
+_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+class _Pool:
+    """Small per-process pool of long-lived SQLite connections, reused across requests."""
+
+    def __init__(self, maxsize: int = 8):
+        self._maxsize = maxsize
+        self._pid = os.getpid()
+        self._idle = queue.Queue(maxsize=maxsize)
+
+    def _check_pid(self):
+        # SQLite handles must not cross fork(); a forked worker (e.g. gunicorn
+        # --preload) abandons the parent's connections and starts its own pool
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = queue.Queue(maxsize=self._maxsize)
+
+    def _new(self):
+        # connections are handed between request threads through the queue
+        cx = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
+        cx.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            cx.execute(pragma)
+        return cx
+
+    def get(self):
+        self._check_pid()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._new()
+
+    def put(self, cx):
+        if self._pid != os.getpid():
+            return
+        try:
+            self._idle.put_nowait(cx)
+        except queue.Full:
+            cx.close()
+
 
+_POOL = _Pool()
 
-def _table_has_column(cx, table, col):
+
+@contextmanager
+def _connect():
+    """Check a connection out of the pool; commit on success, roll back on error."""
+    cx = _POOL.get()
     try:
-        cur = cx.execute(f"PRAGMA table_info({table})")
-        cols = [r["name"] for r in cur.fetchall()]
-        return col in cols
-    except Exception:
-        return False
+        yield cx
+        cx.commit()
+    except BaseException:
+        try:
+            cx.rollback()
+        except sqlite3.Error:
+            # unusable connection: drop it instead of returning it to the pool
+            cx.close()
+        else:
+            _POOL.put(cx)
+        raise
+    _POOL.put(cx)
+
+
+# one writer per process; see _connect_write()
+_WRITE_LOCK = threading.Lock()
+
+
+@contextmanager
+def _connect_write():
+    """_connect() for writes: request threads queue on an in-process lock
+    instead of SQLite's sleep-and-retry busy handler, so a waiting writer
+    starts as soon as the previous one commits."""
+    with _WRITE_LOCK, _connect() as cx:
+        # take SQLite's write lock up front rather than upgrading a deferred
+        # read transaction mid-statement (which can fail with SQLITE_BUSY)
+        cx.execute("BEGIN IMMEDIATE")
+        yield cx
+
+
+# table -> column names, read once at startup by _load_schema()
+_SCHEMA: dict[str, set[str]] = {}
+
+
+def _load_schema(cx, tables=("attempts",)):
+    return {t: {r["name"] for r in cx.execute(f"PRAGMA table_info({t})")} for t in tables}
+
+
+def _table_has_column(table, col):
+    return col in _SCHEMA.get(table, ())
 
 
 def _ensure_db():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     with _connect() as cx:
+        # WAL: readers don't block the writer and commits don't fsync the main file
+        cx.execute("PRAGMA journal_mode=WAL")
         # create table if not exists (base schema)
         cx.execute("""
             CREATE TABLE IF NOT EXISTS attempts (
@@ -142,19 +265,34 @@ def _ensure_db():
             cx.execute("ALTER TABLE attempts ADD COLUMN category TEXT")
         if "created_at" not in cols:
             cx.execute("ALTER TABLE attempts ADD COLUMN created_at TEXT")
+        # indexes for the listing/filter paths (no-ops if already there)
+        cur = cx.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'attempts'")
+        have = {r["name"] for r in cur.fetchall()}
+        wanted = {
+            "ix_attempts_quiz_created": "attempts(quiz_id, created_at DESC)",
+            "ix_attempts_viewer":       "attempts(viewer)",
+            # per-viewer partitions (latest/best pick, delete_by_viewer)
+            "ix_attempts_quiz_viewer_created": "attempts(quiz_id, viewer, created_at, id)",
+        }
+        for name, target in wanted.items():
+            cx.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
         cx.commit()
+        if not have.issuperset(wanted):
+            # refresh planner statistics once, when new indexes were added
+            cx.execute("ANALYZE")
 
 
 def _answers_col_name(cx):
     # prefer answers_json if present; else fall back to answers if that exists
-    if _table_has_column(cx, "attempts", "answers_json"):
+    if _table_has_column("attempts", "answers_json"):
         return "answers_json"
-    if _table_has_column(cx, "attempts", "answers"):
+    if _table_has_column("attempts", "answers"):
         return "answers"
     # ensure answers_json exists for new installs
     try:
         cx.execute("ALTER TABLE attempts ADD COLUMN answers_json TEXT")
         cx.commit()
+        _SCHEMA.setdefault("attempts", set()).add("answers_json")
         return "answers_json"
     except Exception:
         # last-resort: no column available (should not happen)
@@ -162,11 +300,54 @@ def _answers_col_name(cx):
 
 _ensure_db()
 
+# schema and answers column are fixed once _ensure_db() has run; read them a single time
+with _connect() as _cx:
+    _SCHEMA.update(_load_schema(_cx))
+    _ANSWERS_COL = _answers_col_name(_cx)
+    # JSON1 (json_valid/json_extract/json_each) is missing before 3.9 and from
+    # 3.9-3.37 builds made without SQLITE_ENABLE_JSON1; probe instead of assuming
+    try:
+        _cx.execute("SELECT json_valid('{}')").fetchone()
+        _HAS_JSON1 = True
+    except sqlite3.OperationalError:
+        _HAS_JSON1 = False
+del _cx
+
+# Hot statements, fixed at startup so every pooled connection's statement cache
+# reuses them. Only the trusted column name is interpolated; values stay bound.
+SQL_INSERT_ATTEMPT = f"""
+    INSERT INTO attempts
+        (quiz_id, viewer, points, max_points, score_percent, {_ANSWERS_COL}, category, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# RETURNING (SQLite >= 3.35) hands back the new id from the INSERT itself
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+SQL_INSERT_ATTEMPT_RETURNING = SQL_INSERT_ATTEMPT.rstrip() + " RETURNING id\n"
+SQL_SELECT_ATTEMPTS = f"""
+    SELECT id, quiz_id, viewer, points, max_points, score_percent, {_ANSWERS_COL} AS {_ANSWERS_COL}, category, created_at
+    FROM attempts
+    WHERE 1=1
+"""
+# same rows without the answers blob; only the watch meta is pulled out, in SQL
+# (JSON1 only; without it the light path reads SQL_SELECT_ATTEMPTS instead)
+SQL_SELECT_ATTEMPTS_NO_ANSWERS = f"""
+    SELECT id, quiz_id, viewer, points, max_points, score_percent, category, created_at,
+        CASE WHEN json_valid({_ANSWERS_COL}) THEN json_extract({_ANSWERS_COL}, '$.__meta.watchPercent') END AS watch_percent,
+        CASE WHEN json_valid({_ANSWERS_COL}) THEN json_extract({_ANSWERS_COL}, '$.__meta.watchSeconds') END AS watch_seconds
+    FROM attempts
+    WHERE 1=1
+"""
+
 # ------------------------------------------------------------------------------
 # Sanitization
 # ------------------------------------------------------------------------------
 
-SAFE_TEXT_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')  # keep \t \n
+# control characters to strip (keep \t \n \r); used with str.translate
+_STRIP_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F])
+
+# ASCII bytes not allowed in viewer ids (non-ASCII is dropped by the encode step)
+_VIEWER_KEEP = frozenset((string.ascii_letters + string.digits + "._-").encode('ascii'))
+_VIEWER_DROP = bytes(b for b in range(128) if b not in _VIEWER_KEEP)
 
 
 # ======================================================================
@@ -177,14 +358,14 @@ SAFE_TEXT_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')  # keep \t \n
 
 def sanitize_text(s: str, limit: int = 500) -> str:
     s = '' if s is None else str(s)
-    s = SAFE_TEXT_RE.sub('', s)
+    s = s.translate(_STRIP_TABLE)
     return s[:max(1, int(limit))]
 
 
 def sanitize_viewer(s: str) -> str:
     # Keep alnum, dot, underscore, hyphen; trim to 120 chars
     s = sanitize_text(s, 120)
-    return re.sub(r'[^A-Za-z0-9._-]+', '', s)
+    return s.encode('ascii', 'ignore').translate(None, _VIEWER_DROP).decode('ascii')
 
 
 # ======================================================================
@@ -193,42 +374,92 @@ def sanitize_viewer(s: str) -> str:
 # ======================================================================
 """Load and manipulate quiz JSON and metadata."""
 
-def _load_quiz_json(quiz_id: str) -> dict:
+# quiz_id -> (st_mtime_ns, parsed quiz, derived views); entries are shared,
+# callers must not mutate. Derived views are built lazily by _quiz_derived().
+_QUIZ_CACHE: dict[str, tuple[int, dict, dict]] = {}
+
+
+def _quiz_entry(quiz_id: str):
     fp = CONTENT_DIR / f"{quiz_id}.json"
-    return json.loads(fp.read_text(encoding='utf-8'))
+    mtime = fp.stat().st_mtime_ns
+    hit = _QUIZ_CACHE.get(quiz_id)
+    if hit is not None and hit[0] == mtime:
+        return hit
+    entry = (mtime, _json_loads(fp.read_bytes()), {})
+    _QUIZ_CACHE[quiz_id] = entry
+    return entry
+
+
+def _load_quiz_json(quiz_id: str) -> dict:
+    return _quiz_entry(quiz_id)[1]
+
+
+def _quiz_derived(quiz_id: str, name: str, build):
+    """Return build(quiz) computed once per quiz file version."""
+    _, data, derived = _quiz_entry(quiz_id)
+    if name not in derived:
+        derived[name] = build(data)
+    return derived[name]
+
+
+def _build_maxlens(data: dict) -> dict:
+    out = {}
+    for it in data.get('items', []):
+        typ = str(it.get('type','')).lower()
+        if typ in ('fr','free','free_response'):
+            out[str(it.get('id'))] = int(it.get('maxLen') or 500)
+    return out
 
 
 def _load_quiz_maxlens(quiz_id: str):
     """Return {item_id: maxLen} for free-response items; default 500 if absent."""
     try:
-        data = _load_quiz_json(quiz_id)
+        return _quiz_derived(quiz_id, 'maxlens', _build_maxlens)
     except Exception:
         return {}
+
+
+def _build_items_by_type(data: dict) -> dict:
+    """{lowercased type: [(position, item), ...]} in quiz order."""
     out = {}
-    for it in data.get('items', []):
-        typ = str(it.get('type','')).lower()
-        if typ in ('fr','free','free_response'):
-            out[str(it.get('id'))] = int(it.get('maxLen') or 500)
+    for pos, it in enumerate(data.get('items', [])):
+        out.setdefault(str(it.get('type','')).lower(), []).append((pos, it))
     return out
 
 
-def _quiz_items_by_type(qz: dict, types: set[str]) -> list[dict]:
-    return [it for it in qz.get('items', []) if str(it.get('type','')).lower() in types]
+def _quiz_items_by_type(quiz_id: str, types: set[str]) -> list[dict]:
+    by_type = _quiz_derived(quiz_id, 'items_by_type', _build_items_by_type)
+    hits = [by_type[t] for t in types if t in by_type]
+    if len(hits) == 1:
+        return [it for _, it in hits[0]]
+    # several aliases present (e.g. 'fr' and 'free'): restore quiz order
+    return [it for _, it in sorted((p for h in hits for p in h), key=lambda p: p[0])]
+
+
+def _fmt_watch(v) -> str:
+    # normalize to strings to avoid 'None' in CSV; keep 2 decimals when present
+    return "" if v is None else f"{float(v):.2f}"
+
+
+def _raw_watch_meta(ans):
+    """Return the raw (watchPercent, watchSeconds) from answers JSON, None when absent."""
+    if isinstance(ans, (str, bytes)):
+        try:
+            ans = _json_loads(ans)
+        except Exception:
+            return None, None
+    if not isinstance(ans, dict):
+        return None, None
+    meta = ans.get('__meta')
+    if not isinstance(meta, dict):
+        return None, None
+    return meta.get('watchPercent'), meta.get('watchSeconds')
 
 
 def _extract_watch_meta(ans):
     """Return (watch_percent, watch_seconds) from answers JSON."""
-    try:
-        if isinstance(ans, str):
-            ans = json.loads(ans)
-    except Exception:
-        ans = {}
-    meta = ans.get('__meta', {}) if isinstance(ans, dict) else {}
-    wp = meta.get('watchPercent', None)
-    ws = meta.get('watchSeconds', None)
-    # normalize to strings to avoid 'None' in CSV; keep 2 decimals when present
-    fmt = lambda v: (f"{float(v):.2f}" if isinstance(v, (int, float)) else ("{:.2f}".format(float(v)) if v is not None else ""))
-    return fmt(wp), fmt(ws)
+    wp, ws = _raw_watch_meta(ans)
+    return _fmt_watch(wp), _fmt_watch(ws)
 
 
 # ======================================================================
@@ -237,18 +468,32 @@ def _extract_watch_meta(ans):
 # ======================================================================
 """Authorization checks for viewing/deleting quizzes."""
 
+def _key_matches(given: str, expected: str) -> bool:
+    # constant-time compare; encode so non-ASCII input cannot raise
+    return bool(given) and hmac.compare_digest(given.encode("utf-8"), expected.encode("utf-8"))
+
+
+def _key_from_request(req: request, name: str) -> str:
+    """?name=... first; only parse a JSON body when one was actually sent."""
+    q = req.args.get(name)
+    if not q and req.is_json and req.content_length:
+        # be tolerant about missing/invalid JSON
+        body = req.get_json(silent=True)
+        if isinstance(body, dict):
+            q = body.get(name)
+    return (q or "").strip()
+
+
 def delete_ok(req: request) -> bool:
     """enforce: deletes only wth key set"""
     if not DELETE_KEY:
         return False
     # header takes precedence
     hdr = req.headers.get("X-Delete-Key", "").strip()
-    if hdr and hdr == DELETE_KEY:
+    if _key_matches(hdr, DELETE_KEY):
         return True
-    # query/body fallback (be tolerant about missing/invalid JSON)
-    body = req.get_json(silent=True) or {}
-    q = (req.args.get("delete_key") or body.get("delete_key") or "").strip()
-    return q == DELETE_KEY
+    # query/body fallback
+    return _key_matches(_key_from_request(req, "delete_key"), DELETE_KEY)
 
 
 def view_ok(req: request) -> bool:
@@ -257,12 +502,10 @@ def view_ok(req: request) -> bool:
         return False
     # accept ONLY the X-View-Key header or ?view_key=...
     hdr = (req.headers.get("X-View-Key") or "").strip()
-    if hdr == VIEW_KEY:
+    if _key_matches(hdr, VIEW_KEY):
         return True
-    # query/body fallback (be tolerant about missing/invalid JSON)
-    body = req.get_json(silent=True) or {}
-    q = (req.args.get("view_key") or body.get("view_key") or "").strip()
-    return q == VIEW_KEY
+    # query/body fallback
+    return _key_matches(_key_from_request(req, "view_key"), VIEW_KEY)
 
 
 
@@ -280,38 +523,59 @@ def _frontend_path(*parts) -> Path:
     p = FRONTEND_DIR.joinpath(*parts)
     return p
 
+
+def _existing(fp: Path):
+    """(directory, filename) for send_from_directory, or None if fp is missing."""
+    return (fp.parent.as_posix(), fp.name) if fp.exists() else None
+
+# page files are resolved once at startup (restart to pick up added pages)
+_INDEX_HTML        = _existing(_frontend_path("index.html"))
+_INDEX_SIMPLE_HTML = _existing(_frontend_path("index-simple.html"))
+_DASHBOARD_HTML    = _existing(_frontend_path("dashboard.html"))
+
 @app.get("/")
 def index():
     # Serve the multi-player page by default
-    fp = _frontend_path("index.html")
-    if fp.exists():
-        return send_from_directory(fp.parent.as_posix(), fp.name)
-    return jsonify({"ok": False, "error": "index.html not found"}), 404
+    if _INDEX_HTML:
+        return send_from_directory(*_INDEX_HTML)
+    return _json_response({"ok": False, "error": "index.html not found"}), 404
 
     # Serve the single-player page, if desired
 @app.get("/index-simple")
 def index_simple():
-    fp = _frontend_path("index-simple.html")
-    if fp.exists():
-        return send_from_directory(fp.parent.as_posix(), fp.name)
-    return jsonify({"ok": False, "error": "index-simple.html not found"}), 404
+    if _INDEX_SIMPLE_HTML:
+        return send_from_directory(*_INDEX_SIMPLE_HTML)
+    return _json_response({"ok": False, "error": "index-simple.html not found"}), 404
 
 @app.get("/dashboard")
 def dashboard():
-    fp = FRONTEND_DIR / "dashboard.html"
-    if fp.exists():
-        return send_from_directory(fp.parent.as_posix(), fp.name)
-    return jsonify({"ok": False, "error": "dashboard.html not found"}), 404
+    if _DASHBOARD_HTML:
+        return send_from_directory(*_DASHBOARD_HTML)
+    return _json_response({"ok": False, "error": "dashboard.html not found"}), 404
+
+# static roots that exist at startup, in search order, with their posix strings
+_STATIC_ROOTS: tuple[tuple[Path, str], ...] = tuple((r, r.as_posix()) for r in STATIC_DIRS if r.exists())
+
+
+# hits are memoized for the life of the process: restart after deleting a served
+# file or adding one to an earlier root (misses are not cached)
+@lru_cache(maxsize=4096)
+def _static_root_for(subpath: str) -> str:
+    """First root (as posix) containing subpath; misses raise, so only hits are memoized."""
+    for root, posix in _STATIC_ROOTS:
+        if (root / subpath).exists():
+            return posix
+    raise LookupError(subpath)
+
 
 @app.get("/static/<path:subpath>")
 def static_files(subpath):
-    # Serve first match across the configured roots
-    for root in STATIC_DIRS:
-        if root.exists():
-            candidate = root / subpath
-            if candidate.exists():
-                return send_from_directory(root.as_posix(), subpath)
-    return jsonify({"ok": False, "error": f"static file not found: {subpath}"}), 404
+    # Serve first match across the configured roots (conditional GETs get 304s)
+    try:
+        root = _static_root_for(subpath)
+    except LookupError:
+        return _json_response({"ok": False, "error": f"static file not found: {subpath}"}), 404
+    return send_from_directory(root, subpath)
 
 # ======================================================================
 # API endpoints (quizzes)
@@ -323,33 +587,51 @@ def static_files(subpath):
 # Quiz content
 # ------------------------------------------------------------------------------
 
-@app.get("/api/quizzes")
-def list_quizzes():
-    CONTENT_DIR.mkdir(parents=True, exist_ok=True)
-    items = []
+# Serialized /api/quizzes body, keyed by the (name, mtime_ns) signature of CONTENT_DIR
+_INDEX_CACHE = {"sig": None, "body": b""}
+
+
+def _quiz_dir_signature():
+    sig = []
     for fp in sorted(CONTENT_DIR.glob("*.json")):
         try:
-            data = json.loads(fp.read_text(encoding='utf-8'))
-        except Exception:
+            sig.append((fp.name, fp.stat().st_mtime_ns))
+        except OSError:
             continue
-        qid = fp.stem
-        title = data.get("title") or qid
-        category = data.get("category")
-        group = data.get("group")
-        items.append({"id": qid, "title": title, "category": category, "group": group})
-    return jsonify({"quizzes": items})
+    return tuple(sig)
+
+
+@app.get("/api/quizzes")
+def list_quizzes():
+    CONTENT_DIR.mkdir(parents=True, exist_ok=True)
+    sig = _quiz_dir_signature()
+    if sig != _INDEX_CACHE["sig"]:
+        items = []
+        for name, _ in sig:
+            qid = name[:-len(".json")]
+            try:
+                data = _load_quiz_json(qid)
+            except Exception:
+                continue
+            title = data.get("title") or qid
+            category = data.get("category")
+            group = data.get("group")
+            items.append({"id": qid, "title": title, "category": category, "group": group})
+        # body first, so a concurrent reader never pairs the new sig with a stale body
+        _INDEX_CACHE["body"] = _json_dumps({"quizzes": items})
+        _INDEX_CACHE["sig"] = sig
+    return Response(_INDEX_CACHE["body"], mimetype="application/json")
 
 @app.get("/api/quiz/<quiz_id>")
 def get_quiz(quiz_id):
     fp = CONTENT_DIR / f"{quiz_id}.json"
     if not fp.exists():
-        return jsonify({"error": "quiz not found"}), 404
+        return _json_response({"error": "quiz not found"}), 404
     try:
-        data = json.loads(fp.read_text(encoding='utf-8'))
-        data["id"] = quiz_id
-        return jsonify(data)
+        data = {**_load_quiz_json(quiz_id), "id": quiz_id}
+        return _json_response(data)
     except Exception as e:
-        return jsonify({"error": f"failed to read quiz: {e}"}), 500
+        return _json_response({"error": f"failed to read quiz: {e}"}), 500
 
 
 # ======================================================================
@@ -371,10 +653,13 @@ def submit_attempt(quiz_id):
     # Sanitize viewer and free text
     viewer = sanitize_viewer(raw_viewer)
 
-    maxlens = _load_quiz_maxlens(quiz_id)
-    for item_id, val in list(answers.items()):
+    maxlens = None  # loaded on first free-text answer
+    # only the nested val dicts are mutated, never answers itself: no copy needed
+    for item_id, val in answers.items():
         if isinstance(val, dict):
             if 'text' in val:
+                if maxlens is None:
+                    maxlens = _load_quiz_maxlens(quiz_id)
                 lim = int(maxlens.get(item_id, val.get('maxLen') or 500))
                 val['text'] = sanitize_text(val.get('text', ''), lim)
                 val['maxLen'] = lim
@@ -386,25 +671,24 @@ def submit_attempt(quiz_id):
     created_at = dt.datetime.now(dt.timezone.utc).isoformat()
     score_percent = round((points / max_points) * 100, 2) if max_points else 0.0
 
-    with _connect() as cx:
-        ans_col = _answers_col_name(cx)
-        cx.execute(f"""
-            INSERT INTO attempts
-                (quiz_id, viewer, points, max_points, score_percent, {ans_col}, category, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    with _connect_write() as cx:
+        params = (
             quiz_id,
             viewer,
             points,
             max_points,
             score_percent,
-            json.dumps(answers, ensure_ascii=False),
+            _json_dumps(answers).decode('utf-8'),
             category,
-            created_at
-        ))
-        attempt_id = cx.execute('SELECT last_insert_rowid()').fetchone()[0]
+            created_at,
+        )
+        if _HAS_RETURNING:
+            attempt_id = cx.execute(SQL_INSERT_ATTEMPT_RETURNING, params).fetchone()[0]
+        else:
+            cx.execute(SQL_INSERT_ATTEMPT, params)
+            attempt_id = cx.execute('SELECT last_insert_rowid()').fetchone()[0]
 
-    return jsonify({
+    return _json_response({
         "ok": True,
         "id": attempt_id,
         "quiz_id": quiz_id,
@@ -420,38 +704,79 @@ def submit_attempt(quiz_id):
 # Attempts listing / helpers
 # ------------------------------------------------------------------------------
 
-def _row_to_attempt_dict(row, answers_col_name: str):
-    # Cope with either answers_json or answers column name
-    answers_raw = row.get(answers_col_name, None)
-    try:
-        answers = json.loads(answers_raw) if answers_raw else {}
-    except Exception:
-        answers = {}
-    points = float(row.get("points") or 0)
-    max_points = float(row.get("max_points") or 0)
-    score_percent = row.get("score_percent")
+def _row_to_attempt_dict(row, answers_col_name: str, load_answers: bool = True):
+    # row is the sqlite3.Row from SQL_SELECT_ATTEMPTS (load_answers, or no JSON1)
+    # or SQL_SELECT_ATTEMPTS_NO_ANSWERS; index it directly
+    if load_answers:
+        # Cope with either answers_json or answers column name
+        answers_raw = row[answers_col_name]
+        try:
+            answers = _json_loads(answers_raw) if answers_raw else {}
+        except Exception:
+            answers = {}
+    else:
+        answers = None
+    # REAL columns already come back as float; only coerce NULLs and odd legacy values
+    points = row["points"]
+    if type(points) is not float:
+        points = float(points or 0)
+    max_points = row["max_points"]
+    if type(max_points) is not float:
+        max_points = float(max_points or 0)
+    score_percent = row["score_percent"]
     if score_percent is None:
         score_percent = round((points / max_points) * 100, 2) if max_points else 0.0
-    return {
+    elif type(score_percent) is not float:
+        score_percent = float(score_percent)
+    out = {
         "id": row["id"],
         "quiz_id": row["quiz_id"],
         "viewer": row["viewer"],
         "points": points,
         "max_points": max_points,
-        "score_percent": float(score_percent),
+        "score_percent": score_percent,
         "answers": answers,  # kept for compatibility if someone wants full JSON via API
-        "category": row.get("category"),
-        "created_at": row.get("created_at"),
+        "category": row["category"],
+        "created_at": row["created_at"],
     }
+    if not load_answers:
+        if _HAS_JSON1:
+            # raw __meta values extracted by SQL_SELECT_ATTEMPTS_NO_ANSWERS
+            out["watch_percent"] = row["watch_percent"]
+            out["watch_seconds"] = row["watch_seconds"]
+        else:
+            # no JSON1: the blob was fetched anyway; pull __meta out here
+            out["watch_percent"], out["watch_seconds"] = _raw_watch_meta(row[answers_col_name])
+    return out
+
+# ROW_NUMBER() ordering that puts the kept attempt first per (quiz_id, viewer);
+# mirrors _best_or_latest (score as computed by _row_to_attempt_dict)
+_PICK_ORDER = {
+    "latest": "created_at DESC, id DESC",
+    "best": "COALESCE(score_percent, CASE WHEN max_points THEN ROUND(points * 100.0 / max_points, 2) ELSE 0 END) DESC, "
+            "created_at DESC, id DESC",
+}
+_HAS_WINDOW_FUNCS = sqlite3.sqlite_version_info >= (3, 25, 0)
 
-def _fetch_attempts(quiz_id=None, viewer=None):
+
+_FETCH_BATCH = 1000
+
+
+def _iter_attempts(quiz_id=None, viewer=None, mode="all", load_answers=True):
+    """
+    Yield attempts in (created_at, id) order, _FETCH_BATCH rows at a time, holding a
+    pooled connection until exhausted. mode='latest'|'best' keeps one attempt per
+    (quiz_id, viewer), selected in SQL, listed in order of each viewer's first attempt.
+    load_answers=False skips fetching/decoding the answers blob ('answers' is None)
+    and returns the raw watch_percent/watch_seconds instead.
+    """
+    pick = _PICK_ORDER.get(mode)
+    if pick and not _HAS_WINDOW_FUNCS:
+        # SQLite < 3.25: no window functions, group in Python
+        yield from _best_or_latest(_iter_attempts(quiz_id, viewer, "all", load_answers), mode=mode)
+        return
     with _connect() as cx:
-        ans_col = _answers_col_name(cx)
-        sql = f"""
-            SELECT id, quiz_id, viewer, points, max_points, score_percent, {ans_col} AS {ans_col}, category, created_at
-            FROM attempts
-            WHERE 1=1
-        """
+        sql = SQL_SELECT_ATTEMPTS if load_answers or not _HAS_JSON1 else SQL_SELECT_ATTEMPTS_NO_ANSWERS
         params = []
         if quiz_id:
             sql += " AND quiz_id = ?"
@@ -459,119 +784,221 @@ def _fetch_attempts(quiz_id=None, viewer=None):
         if viewer:
             sql += " AND viewer = ?"
             params.append(viewer)
-        sql += " ORDER BY created_at ASC, id ASC"
+        if pick:
+            sql = f"""
+                SELECT * FROM (
+                    SELECT a.*,
+                        ROW_NUMBER() OVER (PARTITION BY quiz_id, viewer ORDER BY {pick}) AS rn,
+                        MIN(created_at) OVER (PARTITION BY quiz_id, viewer) AS first_at,
+                        FIRST_VALUE(id) OVER (PARTITION BY quiz_id, viewer ORDER BY created_at, id) AS first_id
+                    FROM ({sql}) AS a
+                )
+                WHERE rn = 1
+                ORDER BY first_at ASC, first_id ASC
+            """
+        else:
+            sql += " ORDER BY created_at ASC, id ASC"
         cur = cx.execute(sql, params)
-        rows = [dict(r) for r in cur.fetchall()]
-        return [_row_to_attempt_dict(r, ans_col) for r in rows]
+        while True:
+            batch = cur.fetchmany(_FETCH_BATCH)
+            if not batch:
+                break
+            for r in batch:
+                yield _row_to_attempt_dict(r, _ANSWERS_COL, load_answers)
+
+
+def _fetch_attempts(quiz_id=None, viewer=None, mode="all", load_answers=True):
+    """List form of _iter_attempts()."""
+    return list(_iter_attempts(quiz_id, viewer, mode, load_answers))
 
 def _best_or_latest(rows, mode="latest"):
     """
     Group by (quiz_id, viewer) and pick 'latest' (by created_at then id) or 'best' (score_percent).
     """
-    from collections import defaultdict
-    buckets = defaultdict(list)
+    if mode == "best":
+        key = lambda x: ((x.get('score_percent') or 0.0), x['created_at'], x['id'])
+    else:
+        key = lambda x: (x['created_at'], x['id'])
+    # single pass: keep the max row per group (>= so ties go to the later row,
+    # as the previous stable sort + [-1] did); dict order = first appearance
+    out = {}
     for r in rows:
-        buckets[(r['quiz_id'], r['viewer'])].append(r)
-    out = []
-    for (_, _), arr in buckets.items():
-        if mode == "best":
-            arr_sorted = sorted(arr, key=lambda x: ((x.get('score_percent') or 0.0), x['created_at'], x['id']))
-        else:
-            arr_sorted = sorted(arr, key=lambda x: (x['created_at'], x['id']))
-        out.append(arr_sorted[-1])
-    return out
+        k = (r['quiz_id'], r['viewer'])
+        cur = out.get(k)
+        if cur is None or key(r) >= key(cur):
+            out[k] = r
+    return list(out.values())
 
 @app.get("/api/attempts")
 def list_attempts():
     quiz_id = request.args.get("quiz_id") or None
     viewer  = request.args.get("viewer") or None
     mode    = (request.args.get("attempt") or "all").lower()  # all|latest|best
+    # answers are included unless the caller opts out with include_answers=0
+    include_answers = (request.args.get("include_answers") or "1") in ("1", "true", "yes")
 
-    rows = _fetch_attempts(quiz_id, viewer)
-    if mode in ("latest", "best"):
-        rows = _best_or_latest(rows, mode=mode)
+    rows = _fetch_attempts(quiz_id, viewer, mode=mode, load_answers=include_answers)
 
-    return jsonify({"attempts": rows})
+    return _json_response({"attempts": rows})
 
 
 # ------------------------------------------------------------------------------
 # Delete endpoints
 # ------------------------------------------------------------------------------
 
+# _protect() runs on every request; its path tests are fixed tuples so each
+# check is one C-level startswith/endswith call
+_SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+_UI_PAGES = frozenset(("/", "/dashboard"))
+_STATIC_EXTS = (".js", ".css", ".map", ".ico",      # common assets
+                ".png", ".jpg", ".svg",
+                ".woff", ".woff2", ".ttf", ".eot",
+                ".txt")
+_PUBLIC_PREFIXES = ("/api/quizzes", "/api/quiz/")
+_VIEW_GET_PREFIXES = ("/api/attempts", "/api/responses")
+_VIEW_PREFIXES = ("/api/export",)
+_DESTRUCTIVE_PREFIXES = ("/api/attempts/delete_",)
+
+
 @app.before_request
 def _protect():
     p = request.path or ""
     m = request.method
     # --- Always allow the UI shell and static assets to load ---
-    if m in ("GET", "HEAD", "OPTIONS"):
+    if m in _SAFE_METHODS:
         if (
-            p in ("/", "/dashboard") or                     # the HTML
+            p in _UI_PAGES or                               # the HTML
             p.startswith("/static/") or                     # your static dir (adjust if different)
-            p.endswith((".js", ".css", ".map", ".ico",      # common assets
-                        ".png", ".jpg", ".svg",
-                        ".woff", ".woff2", ".ttf", ".eot",
-                        ".txt"))
+            p.endswith(_STATIC_EXTS)
         ):
             return  # allow UI to load so the user can enter a key
 
+    # everything guarded below lives under /api/
+    if not p.startswith("/api/"):
+        return None
+
     # Public read APIs (needed by learners & public pages)
-    if p.startswith("/api/quizzes") or p.startswith("/api/quiz/"):
+    if p.startswith(_PUBLIC_PREFIXES):
         return None
 
     # View-only APIs (must have VIEW_KEY)
     if (
-        (p.startswith("/api/attempts") and m == "GET") or
-        (p.startswith("/api/responses") and m == "GET") or
-        p.startswith("/api/export")
+        (m == "GET" and p.startswith(_VIEW_GET_PREFIXES)) or
+        p.startswith(_VIEW_PREFIXES)
     ):
         if not view_ok(request):
-            return jsonify({"error":"unauthorized"}), 401
+            return _json_response({"error":"unauthorized"}), 401
 
     # destructive surfaces: need DELETE_KEY if set
     if (
-        (p.startswith("/api/attempt/") and m == "DELETE") or
-        p.startswith("/api/attempts/delete_")
+        (m == "DELETE" and p.startswith("/api/attempt/")) or
+        p.startswith(_DESTRUCTIVE_PREFIXES)
     ):
         if not delete_ok(request):
-            return jsonify({"error":"unauthorized"}), 401
+            return _json_response({"error":"unauthorized"}), 401
 
 @app.delete("/api/attempt/<int:attempt_id>")
 def delete_attempt(attempt_id: int):
     if not delete_ok(request):
-        return jsonify({"error": "unauthorized"}), 401
-    with _connect() as cx:
+        return _json_response({"error": "unauthorized"}), 401
+    with _connect_write() as cx:
         cx.execute("DELETE FROM attempts WHERE id = ?", (attempt_id,))
-    return jsonify({"ok": True, "deleted": attempt_id})
+    return _json_response({"ok": True, "deleted": attempt_id})
 
 @app.post("/api/attempts/delete_by_viewer")
 def delete_by_viewer():
     if not delete_ok(request):
-        return jsonify({"error": "unauthorized"}), 401
+        return _json_response({"error": "unauthorized"}), 401
     data = request.get_json(silent=True) or {}
     quiz_id = (request.args.get("quiz_id") or data.get("quiz_id") or "").strip()
     viewer  = (request.args.get("viewer")  or data.get("viewer") or "").strip()
     if not quiz_id or not viewer:
-        return jsonify({"error": "quiz_id and viewer required"}), 400
-    with _connect() as cx:
+        return _json_response({"error": "quiz_id and viewer required"}), 400
+    with _connect_write() as cx:
         cx.execute("DELETE FROM attempts WHERE quiz_id = ? AND viewer = ?", (quiz_id, viewer))
-    return jsonify({"ok": True, "deleted_viewer": viewer, "quiz_id": quiz_id})
+    return _json_response({"ok": True, "deleted_viewer": viewer, "quiz_id": quiz_id})
 
 @app.post("/api/attempts/delete_all")
 def delete_all_for_quiz():
     if not delete_ok(request):
-        return jsonify({"error": "unauthorized"}), 401
+        return _json_response({"error": "unauthorized"}), 401
     data = request.get_json(force=True, silent=True) or {}
     quiz_id = (data.get("quiz_id") or "").strip()
     if not quiz_id:
-        return jsonify({"error": "quiz_id required"}), 400
-    with _connect() as cx:
+        return _json_response({"error": "quiz_id required"}), 400
+    with _connect_write() as cx:
         cx.execute("DELETE FROM attempts WHERE quiz_id = ?", (quiz_id,))
-    return jsonify({"ok": True, "deleted_quiz": quiz_id})
+    return _json_response({"ok": True, "deleted_quiz": quiz_id})
+
+# viewers per IN (...) statement when JSON1 is unavailable (+1 for quiz_id)
+_DELETE_BATCH_CHUNK = 500
+
+@app.post("/api/attempts/delete_batch")
+def delete_batch():
+    """
+    Delete the attempts of several viewers across several quizzes in one transaction.
+    JSON body: {"quiz_ids": [...], "viewers": [...]}  (both required, non-empty)
+    """
+    if not delete_ok(request):
+        return _json_response({"error": "unauthorized"}), 401
+    data = request.get_json(force=True, silent=True) or {}
+    quiz_ids = data.get("quiz_ids") if isinstance(data, dict) else None
+    viewers  = data.get("viewers") if isinstance(data, dict) else None
+    if not isinstance(quiz_ids, list) or not isinstance(viewers, list):
+        return _json_response({"error": "quiz_ids and viewers lists required"}), 400
+    quiz_ids = [q for q in (str(x).strip() for x in quiz_ids if x is not None) if q]
+    viewers  = [v for v in (str(x).strip() for x in viewers if x is not None) if v]
+    if not quiz_ids or not viewers:
+        return _json_response({"error": "quiz_ids and viewers lists required"}), 400
+    deleted = 0
+    with _connect_write() as cx:
+        if _HAS_JSON1:
+            # viewers travel as one JSON parameter expanded by json_each, so the
+            # list size is not bound by SQLite's host-parameter limit
+            viewers_json = _json_dumps(viewers).decode()
+            cur = cx.executemany(
+                "DELETE FROM attempts WHERE quiz_id = ? AND viewer IN (SELECT value FROM json_each(?))",
+                [(q, viewers_json) for q in quiz_ids],
+            )
+            deleted = cur.rowcount
+        else:
+            # plain IN lists, chunked to stay under the 999-parameter limit of older SQLite
+            for i in range(0, len(viewers), _DELETE_BATCH_CHUNK):
+                chunk = viewers[i:i + _DELETE_BATCH_CHUNK]
+                cur = cx.executemany(
+                    "DELETE FROM attempts WHERE quiz_id = ? AND viewer IN (%s)" % ",".join("?" * len(chunk)),
+                    [(q, *chunk) for q in quiz_ids],
+                )
+                deleted += cur.rowcount
+    return _json_response({"ok": True, "deleted_rows": deleted, "quizzes": len(quiz_ids), "viewers": len(viewers)})
 
 # ------------------------------------------------------------------------------
 # Export attempts CSV (wide/long)
 # ------------------------------------------------------------------------------
 
+_CSV_FLUSH_BYTES = 64 * 1024
+_CSV_BATCH_ROWS = 256
+
+
+def _csv_chunks(header, lines):
+    """Yield CSV text in ~64 KiB chunks so exports stream instead of buffering."""
+    sio = StringIO()
+    w = csv.writer(sio)
+    w.writerow(header)
+    lines = iter(lines)
+    # writerows() runs its loop in C; slice the generator so we can still flush
+    while True:
+        batch = list(islice(lines, _CSV_BATCH_ROWS))
+        if not batch:
+            break
+        w.writerows(batch)
+        if sio.tell() >= _CSV_FLUSH_BYTES:
+            yield sio.getvalue()
+            sio.seek(0)
+            sio.truncate(0)
+    yield sio.getvalue()
+
+
 @app.get("/api/export/attempts")
 def export_attempts_csv():
     """
@@ -588,30 +1015,25 @@ def export_attempts_csv():
     mode    = (request.args.get("attempt") or "latest").lower()
     include_answers = (request.args.get("include_answers") or "0") in ("1", "true", "yes")
 
-    rows = _fetch_attempts(quiz_id, viewer)
-    if mode in ("latest", "best"):
-        rows = _best_or_latest(rows, mode=mode)
+    rows = _iter_attempts(quiz_id, viewer, mode=mode, load_answers=include_answers)
 
-    sio = StringIO()
-    w = csv.writer(sio)
     base_cols = ['id', 'created_at', 'quiz_id', 'viewer', 'points', 'max_points', 'score_percent','watch_percent', 'watch_seconds']
     if include_answers:
         base_cols.append('answers_json')
-    w.writerow(base_cols)
 
-    
-    for r in rows:
-        wp, ws = _extract_watch_meta(r.get('answers') or {})
-        line = [r['id'], r['created_at'], r['quiz_id'], r['viewer'], r['points'], r['max_points'], r['score_percent'], wp, ws]
-
-
-        if include_answers:
-            line.append(json.dumps(r.get('answers') or {}, ensure_ascii=False))
-        w.writerow(line)
+    def lines():
+        for r in rows:
+            if include_answers:
+                wp, ws = _extract_watch_meta(r.get('answers') or {})
+            else:
+                wp, ws = _fmt_watch(r['watch_percent']), _fmt_watch(r['watch_seconds'])
+            line = [r['id'], r['created_at'], r['quiz_id'], r['viewer'], r['points'], r['max_points'], r['score_percent'], wp, ws]
+            if include_answers:
+                line.append(_json_dumps(r.get('answers') or {}).decode('utf-8'))
+            yield line
 
-    csv_bytes = sio.getvalue().encode('utf-8')
     return Response(
-        csv_bytes,
+        stream_with_context(_csv_chunks(base_cols, lines())),
         mimetype='text/csv',
         headers={'Content-Disposition': f'attachment; filename="attempts_{quiz_id or "all"}_{mode}.csv"'}
     )
@@ -633,9 +1055,7 @@ def list_poll_fr():
     typ = (request.args.get('type') or 'all').lower()
     mode = (request.args.get('attempt') or 'all').lower()
 
-    rows = _fetch_attempts(quiz_id, viewer=None)
-    if mode in ('latest','best'):
-        rows = _best_or_latest(rows, mode=mode)
+    rows = _fetch_attempts(quiz_id, viewer=None, mode=mode)
 
     # Cache quizzes to infer types if answer dict lacks 'kind'
     quiz_cache = {}
@@ -684,7 +1104,7 @@ def list_poll_fr():
                 entry["text"] = txt
             out.append(entry)
 
-    return jsonify({"responses": out})
+    return _json_response({"responses": out})
 
 
 @app.get("/api/polls/aggregate")
@@ -695,19 +1115,15 @@ def aggregate_polls():
     """
     quiz_id = request.args.get('quiz_id')
     if not quiz_id:
-        return jsonify({"error":"quiz_id required"}), 400
+        return _json_response({"error":"quiz_id required"}), 400
 
     mode = (request.args.get('attempt') or 'latest').lower()
-    rows = _fetch_attempts(quiz_id, viewer=None)
-    if mode in ('latest','best'):
-        rows = _best_or_latest(rows, mode=mode)
 
     try:
-        quiz = _load_quiz_json(quiz_id)
+        polls = _quiz_items_by_type(quiz_id, {'poll'})
     except Exception:
-        return jsonify({"quiz_id": quiz_id, "polls": {}})
+        return _json_response({"quiz_id": quiz_id, "polls": {}})
 
-    polls = _quiz_items_by_type(quiz, {'poll'})
     poll_map = { str(it.get('id')): it for it in polls }
     counts = {}
     for pid, it in poll_map.items():
@@ -717,20 +1133,27 @@ def aggregate_polls():
             "choices": { str(c.get('id')): {"text": c.get('text',str(c.get('id'))), "count": 0} for c in choices }
         }
 
-    for r in rows:
+    if not counts:
+        # no poll items: nothing to tally, so don't scan the attempts at all
+        return _json_response({"quiz_id": quiz_id, "polls": counts})
+
+    poll_keys = poll_map.keys()
+    for r in _iter_attempts(quiz_id, viewer=None, mode=mode):
         ans = r.get('answers') or {}
-        for item_id, val in ans.items():
-            if item_id not in poll_map:
-                continue
+        # only answers to poll items matter; intersect instead of testing every key
+        for item_id in ans.keys() & poll_keys:
+            val = ans[item_id]
             if not isinstance(val, dict):
                 continue
-            sel = val.get('selected') or []
-            for v in sel:
-                v = str(v)
-                if v in counts[item_id]["choices"]:
-                    counts[item_id]["choices"][v]["count"] += 1
+            choices_for = counts[item_id]["choices"]
+            for v in val.get('selected') or []:
+                # submit_attempt stores selections as str already
+                if type(v) is not str:
+                    v = str(v)
+                if v in choices_for:
+                    choices_for[v]["count"] += 1
 
-    return jsonify({"quiz_id": quiz_id, "polls": counts})
+    return _json_response({"quiz_id": quiz_id, "polls": counts})
 
 
 @app.get("/api/export/poll_fr")
@@ -745,18 +1168,15 @@ def export_poll_fr():
     """
     quiz_id = request.args.get('quiz_id')
     if not quiz_id:
-        return jsonify({"error":"quiz_id required"}), 400
+        return _json_response({"error":"quiz_id required"}), 400
     attempt_mode = (request.args.get('attempt') or 'latest').lower()
     name_mode = (request.args.get('name_mode') or 'id').lower()
     limit_prompt = int(request.args.get('limit_prompt') or 40)
 
-    rows = _fetch_attempts(quiz_id, viewer=None)
-    if attempt_mode in ('latest','best'):
-        rows = _best_or_latest(rows, mode=attempt_mode)
+    rows = _iter_attempts(quiz_id, viewer=None, mode=attempt_mode)
 
-    quiz = _load_quiz_json(quiz_id)
-    polls = _quiz_items_by_type(quiz, {'poll'})
-    frs   = _quiz_items_by_type(quiz, {'fr','free','free_response'})
+    polls = _quiz_items_by_type(quiz_id, {'poll'})
+    frs   = _quiz_items_by_type(quiz_id, {'fr','free','free_response'})
 
     def col_name(it, prefix):
         if name_mode == 'prompt':
@@ -770,48 +1190,49 @@ def export_poll_fr():
     poll_cols = [(str(it.get('id')), col_name(it,'poll')) for it in polls]
     fr_cols   = [(str(it.get('id')), col_name(it,'fr'))   for it in frs]
 
-    sio = StringIO()
-    w = csv.writer(sio)
     header = ['viewer','quiz_id','created_at','points','max_points','score_percent', 'watch_percent','watch_seconds'] + [c for _,c in poll_cols] + [c for _,c in fr_cols]
-    w.writerow(header)
 
-    for r in rows:
-        ans = r.get('answers') or {}
-        wp, ws = _extract_watch_meta(ans)
-        base = [r['viewer'], r['quiz_id'], r['created_at'], r['points'], r['max_points'], r['score_percent'], wp, ws]
-        ans = r.get('answers') or {}
-        poll_vals = []
-        for item_id, cname in poll_cols:
-            v = ans.get(item_id, {})
-            if isinstance(v, dict) and isinstance(v.get('selected'), list):
-                poll_vals.append('|'.join(str(x) for x in v['selected']))
-            else:
-                poll_vals.append('')
-        fr_vals = []
-        for item_id, cname in fr_cols:
-            v = ans.get(item_id, {})
-            txt = ''
-            if isinstance(v, dict) and 'text' in v:
-                txt = str(v['text'])
-            fr_vals.append(txt)
-        w.writerow(base + poll_vals + fr_vals)
-
-    csv_bytes = sio.getvalue().encode('utf-8')
+    def lines():
+        for r in rows:
+            ans = r.get('answers') or {}
+            wp, ws = _extract_watch_meta(ans)
+            base = [r['viewer'], r['quiz_id'], r['created_at'], r['points'], r['max_points'], r['score_percent'], wp, ws]
+            # one pass over the answers, then a single lookup per column
+            poll_sel, fr_txt = {}, {}
+            for item_id, v in ans.items():
+                if isinstance(v, dict):
+                    sel = v.get('selected')
+                    if isinstance(sel, list):
+                        poll_sel[item_id] = '|'.join(str(x) for x in sel)
+                    if 'text' in v:
+                        fr_txt[item_id] = str(v['text'])
+            yield (base
+                   + [poll_sel.get(item_id, '') for item_id, _ in poll_cols]
+                   + [fr_txt.get(item_id, '') for item_id, _ in fr_cols])
+
     return Response(
-        csv_bytes,
+        stream_with_context(_csv_chunks(header, lines())),
         mimetype='text/csv',
         headers={'Content-Disposition': f'attachment; filename="poll_fr_{quiz_id}_{attempt_mode}.csv"'}
     )
 
 
+def _find_favicon():
+    for root in STATIC_DIRS:
+        for name in ("favicon.svg", "favicon.ico"):
+            hit = _existing(root / name)
+            if hit:
+                return hit
+    return None
+
+# resolved once at startup, like the page files
+_FAVICON = _find_favicon()
+
 @app.get("/favicon.ico")
 @app.get("/favicon.svg")
 def favicon():
-    for root in STATIC_DIRS:
-        for name in ("favicon.svg", "favicon.ico"):
-            fp = root / name
-            if fp.exists():
-                return send_from_directory(root.as_posix(), name)
+    if _FAVICON:
+        return send_from_directory(*_FAVICON)
     return Response(status=204)  # no favicon; stop the browser from retrying
 
 
@@ -847,7 +1268,7 @@ def selftest():
             ok = False
             notes.append(f"DB error: {e}")
 
-    return jsonify({"ok": ok, "notes": notes})
+    return _json_response({"ok": ok, "notes": notes})
 
 
 @app.get("/api/debug/dbinfo")
@@ -862,7 +1283,7 @@ def dbinfo():
             count = cur.fetchone()[0]
             cur = cx.execute("SELECT id, quiz_id, viewer, created_at FROM attempts ORDER BY id DESC LIMIT 5")
             recent = [dict(zip([d[0] for d in cur.description], row)) for row in cur.fetchall()]
-        return jsonify({
+        return _json_response({
             "ok": True,
             "db_path": str(DB_PATH),
             "database_list": dblist,
@@ -871,7 +1292,7 @@ def dbinfo():
             "attempts_recent": recent
         })
     except Exception as e:
-        return jsonify({"ok": False, "error": str(e), "db_path": str(DB_PATH)}), 500
+        return _json_response({"ok": False, "error": str(e), "db_path": str(DB_PATH)}), 500
 
 
 
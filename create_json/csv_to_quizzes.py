@@ -85,12 +85,23 @@ Free response (fr):
 """
 
 import csv, json, re, sys, argparse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, List
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 BOOL_TRUE = {'1','true','yes','y','on','t'}
 BOOL_FALSE = {'0','false','no','n','off','f',''}
 
+# compiled once; these run for every row/field
+_WS_RE = re.compile(r'\s+')
+_SPLIT_RE = re.compile(r'[,\|;]')
+
 
 # ======================================================================
 # Type coercion helpers
@@ -98,6 +109,11 @@ BOOL_FALSE = {'0','false','no','n','off','f',''}
 # ======================================================================
 """Convert CSV values into bool, float, or int."""
 
+# The scalar parsers below are pure and categorical columns repeat the same
+# few strings ("true", "1", "0:05", ...), so results are memoized.
+# (split_list is not: it returns a list that callers keep.)
+
+@lru_cache(maxsize=4096)
 def as_bool(s):
     if s is None:
         return None
@@ -107,6 +123,7 @@ def as_bool(s):
     return None
 
 
+@lru_cache(maxsize=4096)
 def as_float(s, default=None):
     if s is None or str(s).strip()=='':
         return default
@@ -116,6 +133,7 @@ def as_float(s, default=None):
         return default
 
 
+@lru_cache(maxsize=4096)
 def as_int(s, default=None):
     f = as_float(s, None)
     if f is None:
@@ -132,31 +150,29 @@ def as_int(s, default=None):
 # ======================================================================
 """Parse timestamps into seconds."""
 
+@lru_cache(maxsize=4096)
 def parse_time(s):
     """Accept seconds or mm:ss or hh:mm:ss; returns int seconds."""
     if s is None or str(s).strip()=='':
         raise ValueError("blank timestamp")
     s = str(s).strip()
-    # plain seconds
-    try:
-        if re.fullmatch(r'\d+(\.\d+)?', s):
-            return int(round(float(s)))
-    except ValueError:
-        pass
-    # mm:ss or hh:mm:ss
     parts = s.split(':')
-    if not all(p.isdigit() for p in parts):
+    if len(parts) == 1:
+        # plain seconds, optionally with a fractional part
+        whole, dot, frac = s.partition('.')
+        if whole.isdecimal() and (not dot or frac.isdecimal()):
+            return int(round(float(s)))
         raise ValueError(f"Invalid time format: {s}")
-    if len(parts) == 2:
-        m, sec = map(int, parts)
-        return m*60 + sec
-    elif len(parts) == 3:
-        h, m, sec = map(int, parts)
-        return h*3600 + m*60 + sec
-    else:
+    # mm:ss or hh:mm:ss
+    if len(parts) > 3 or not all(p.isdigit() for p in parts):
         raise ValueError(f"Invalid time format: {s}")
+    total = 0
+    for p in parts:
+        total = total*60 + int(p)
+    return total
 
 
+@lru_cache(maxsize=4096)
 def parse_time_safe(s):
     try:
         return parse_time(s)
@@ -172,7 +188,7 @@ def parse_time_safe(s):
 
 def norm_header(h: str) -> str:
     h = (h or '').replace('\ufeff', '')  # remove BOM if present
-    return re.sub(r'\s+', '', h.strip().lower())
+    return _WS_RE.sub('', h.strip().lower())
 
 
 ALT_ID_COLS = ['quiz_id','video_tag','videotag','tag','quiz','id']
@@ -201,7 +217,7 @@ def split_list(s):
     if s is None: return []
     s = str(s).strip()
     if not s: return []
-    return [x.strip() for x in re.split(r'[,\|;]', s) if x.strip()]
+    return [x.strip() for x in _SPLIT_RE.split(s) if x.strip()]
 
 
 def next_id(n):
@@ -217,23 +233,44 @@ def next_id(n):
     return out
 
 
+def _dump_quiz_json(quiz) -> bytes:
+    """Serialize a quiz to indented, newline-terminated UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(quiz, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            pass
+    return (json.dumps(quiz, ensure_ascii=False, indent=2) + '\n').encode('utf-8')
+
+
 # ======================================================================
 # Quiz choice helpers
 # Collect choice/feedback columns into quiz items.
 # ======================================================================
 """Collect choice/feedback columns into quiz items."""
 
-def collect_choices(nrow: Dict[str,str]):
-    # gather choice_a... and feedback_a...
+CHOICE_IDS = tuple("abcdefghijklmnopqrstuvwxyz")
+
+
+def present_columns(normed_headers, prefix: str):
+    """(cid, column) pairs for the a..z columns with this prefix that the CSV has."""
+    return [(cid, f'{prefix}{cid}') for cid in CHOICE_IDS if f'{prefix}{cid}' in normed_headers]
+
+
+def collect_choices(nrow: Dict[str,str], present_choices=None, present_feedback=None):
+    # gather choice_a... and feedback_a...; only probe columns the header has
+    if present_choices is None:
+        present_choices = [(cid, f'choice_{cid}') for cid in CHOICE_IDS]
+    if present_feedback is None:
+        present_feedback = [(cid, f'feedback_{cid}') for cid in CHOICE_IDS]
     choices = []
     feedback = {}
-    # scan a..z safely
-    for i in range(26):
-        cid = chr(ord('a') + i)
-        txt = nrow.get(f'choice_{cid}') or ''
+    for cid, col in present_choices:
+        txt = nrow.get(col) or ''
         if txt:
             choices.append({"id": cid, "text": txt})
-        ftxt = nrow.get(f'feedback_{cid}') or ''
+    for cid, col in present_feedback:
+        ftxt = nrow.get(col) or ''
         if ftxt:
             feedback[cid] = ftxt
     # wildcard feedback
@@ -242,6 +279,100 @@ def collect_choices(nrow: Dict[str,str]):
     return choices, (feedback if feedback else None)
 
 
+# ======================================================================
+# Item builders
+# Type-specific item fields, dispatched on the item type.
+# ======================================================================
+"""Type-specific item fields, dispatched on the item type."""
+
+# each handler takes (nrow, item, choice_cols) and fills item in place
+
+def _h_pause(nrow, item, choice_cols):
+    note = nrow.get('note')
+    if note: item['note'] = note
+
+
+def _h_choices(nrow, item, choice_cols, with_correct=True):
+    choices, fb = collect_choices(nrow, *choice_cols)
+    if choices:
+        item['choices'] = choices
+    # correct only for mcq/checkbox
+    if with_correct:
+        corr = split_list(nrow.get('correct'))
+        if corr:
+            item['correct'] = corr
+    # per-option feedback
+    if fb:
+        item['feedback'] = fb
+
+
+def _h_mcq(nrow, item, choice_cols):
+    _h_choices(nrow, item, choice_cols)
+
+
+def _h_poll(nrow, item, choice_cols):
+    _h_choices(nrow, item, choice_cols, with_correct=False)
+
+
+def _h_checkbox(nrow, item, choice_cols):
+    _h_choices(nrow, item, choice_cols)
+    # checkbox scoring knobs
+    ppc = as_float(nrow.get('pointspercorrect'), None)
+    ppw = as_float(nrow.get('penaltyperwrong'), None)
+    cam = as_bool(nrow.get('capatmax'))
+    if ppc is not None: item['pointsPerCorrect'] = ppc
+    if ppw is not None: item['penaltyPerWrong'] = ppw
+    if cam is not None: item['capAtMax'] = cam
+
+
+def _h_fib(nrow, item, choice_cols):
+    acc = split_list(nrow.get('accept'))
+    if acc: item['accept'] = acc
+    cs = as_bool(nrow.get('casesensitive'))
+    if cs is not None: item['caseSensitive'] = cs
+    ph = nrow.get('placeholder')
+    if ph: item['placeholder'] = ph
+
+
+def _h_fr(nrow, item, choice_cols):
+    mx = as_int(nrow.get('maxlen'), None)
+    if mx is not None: item['maxLen'] = mx
+    ph = nrow.get('placeholder')
+    if ph: item['placeholder'] = ph
+    # by convention, free response is unscored unless explicitly given points
+
+
+_ITEM_HANDLERS = {
+    'pause': _h_pause,
+    'mcq': _h_mcq,
+    'checkbox': _h_checkbox,
+    'poll': _h_poll,
+    'fib': _h_fib,
+    'fr': _h_fr,
+    'free': _h_fr,
+    'free_response': _h_fr,
+}
+
+
+# ======================================================================
+# Quiz meta fields
+# Per-quiz settings read from every row (last non-blank wins).
+# ======================================================================
+"""Per-quiz settings read from every row (last non-blank wins)."""
+
+# (normalized header, output key, converter); converters return None to skip.
+# as_bool already yields True/False/None, so it needs no bool() wrapper.
+_META_FIELDS = (
+    ('allowseeking', 'allowSeeking', as_bool),
+    ('requirecontinue', 'requireContinue', as_bool),
+    ('requirewatchtoend', 'requireWatchToEnd', as_bool),
+    ('requireidentity', 'requireIdentity', as_bool),
+    ('identityprompt', 'identityPrompt', str),
+    ('feedbackdelayseconds', 'feedbackDelaySeconds', as_int),
+    ('endat', 'endAt', parse_time_safe),
+)
+
+
 # ======================================================================
 # Main entrypoint
 # Command-line interface to convert CSV into quiz JSON files.
@@ -262,63 +393,66 @@ def main():
         sys.exit(2)
 
     with csv_path.open(newline='', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames or []
+        reader = csv.reader(f)
+        headers = next(reader, [])
         id_col = args.id_col or pick_id_col(headers)
+        # headers are fixed: normalize them once instead of on every row
+        nheaders = tuple(norm_header(h) for h in headers)
+        ncols = len(nheaders)
+        normed_headers = set(nheaders)
+        # (present_choices, present_feedback) for collect_choices
+        choice_cols = (present_columns(normed_headers, 'choice_'),
+                       present_columns(normed_headers, 'feedback_'))
+        # one dict per quiz; per-quiz fields collect under '_meta' until write-out
         quizzes: Dict[str, Dict[str, Any]] = {}
-        quiz_meta: Dict[str, Dict[str, Any]] = {}
 
-        for rown, row in enumerate(reader, start=2):
-            # normalize headers → values
-            nrow = { norm_header(k): clean(v) for k,v in row.items() }
+        # blank lines are skipped, as DictReader did
+        for rown, values in enumerate((r for r in reader if r), start=2):
+            # normalized headers → values (csv.reader cells are always str, so
+            # strip directly rather than going through clean())
+            nrow = { k: v.strip() for k,v in zip(nheaders, values) }
+            if len(values) != ncols:
+                # ragged row, filled the DictReader way: short → blanks, long → extras joined under ''
+                if len(values) < ncols:
+                    for k in nheaders[len(values):]:
+                        nrow[k] = ''
+                else:
+                    nrow[''] = clean(values[ncols:])
 
             qid = nrow.get(id_col) or ''
             if not qid:
                 # If no group id, skip quietly
                 continue
             # Ensure bucket
-            if qid not in quizzes:
-                quizzes[qid] = {"id": qid, "items": []}
-                quiz_meta[qid] = {}
+            quiz = quizzes.get(qid)
+            if quiz is None:
+                quiz = quizzes[qid] = {"id": qid, "items": [], "_meta": {}}
+            meta = quiz["_meta"]
 
             # per-quiz fields (last non-blank wins)
             def set_meta(key_norm, out_key, conv=lambda x: x):
                 v = nrow.get(key_norm)
                 if v is not None and v != '':
                     try:
-                        quiz_meta[qid][out_key] = conv(v)
+                        meta[out_key] = conv(v)
                     except Exception:
                         pass
 
             set_meta('title','title', str)
             set_meta('category','category', str)
             set_meta('group','group', str)
-            # videoId aliases
-            vid = nrow.get('videoid') or nrow.get('video_id') or nrow.get('videoid')
-            if not vid:
-                vid = nrow.get('videoid')  # normalized version already tried; keep redundancy harmless
-            if not vid:
-                vid = nrow.get('videoid')
-            # better: try via headers map
-            vid = nrow.get('videoid') or nrow.get('video_id') or nrow.get('videoid')
-            if nrow.get('videoid') or nrow.get('video_id'):
-                quiz_meta[qid]['videoId'] = nrow.get('videoid') or nrow.get('video_id')
+            # videoId aliases (norm_header turns videoId into 'videoid')
+            video_id = nrow.get('videoid') or nrow.get('video_id')
+            if video_id:
+                meta['videoId'] = video_id
 
             # Generic meta flags
-            for k_norm, out_key, conv in [
-                ('allowseeking','allowSeeking', lambda x: bool(as_bool(x)) if as_bool(x) is not None else None),
-                ('requirecontinue','requireContinue', lambda x: bool(as_bool(x)) if as_bool(x) is not None else None),
-                ('requirewatchtoend','requireWatchToEnd', lambda x: bool(as_bool(x)) if as_bool(x) is not None else None),
-                ('requireidentity','requireIdentity', lambda x: bool(as_bool(x)) if as_bool(x) is not None else None),
-                ('identityprompt','identityPrompt', str),
-                ('feedbackdelayseconds','feedbackDelaySeconds', lambda x: as_int(x)),
-                ('endat','endAt', parse_time_safe),
-            ]:
+            for k_norm, out_key, conv in _META_FIELDS:
                 v = nrow.get(k_norm)
-                if v not in (None, ''):
+                if v:  # row values are str; skips None and ''
                     val = conv(v)
                     if val is not None:
-                        quiz_meta[qid][out_key] = val
+                        meta[out_key] = val
 
             # item type
             typ = (nrow.get('type') or '').lower()
@@ -335,78 +469,48 @@ def main():
             item_id = (nrow.get('item_id') or '').strip()
             if not item_id:
                 # auto id: per-quiz running count
-                item_id = f"i{len(quizzes[qid]['items'])+1}"
+                item_id = f"i{len(quiz['items'])+1}"
 
-            prompt = nrow.get('prompt') or ''
-            note = nrow.get('note') or ''
+            prompt = nrow.get('prompt')
             points = as_float(nrow.get('points'), None)
 
             item: Dict[str, Any] = {"id": item_id, "t": tval, "type": typ}
             if prompt: item["prompt"] = prompt
             if points is not None: item["points"] = points
-            if typ == 'pause':
-                if note: item['note'] = note
-
-            if typ in ('mcq','checkbox','poll'):
-                choices, fb = collect_choices(nrow)
-                if choices:
-                    item['choices'] = choices
-                # correct only for mcq/checkbox
-                if typ != 'poll':
-                    corr = split_list(nrow.get('correct'))
-                    if corr:
-                        item['correct'] = corr
-                # per-option feedback
-                if fb:
-                    item['feedback'] = fb
-                # checkbox scoring knobs
-                if typ == 'checkbox':
-                    ppc = as_float(nrow.get('pointspercorrect'), None)
-                    ppw = as_float(nrow.get('penaltyperwrong'), None)
-                    cam = as_bool(nrow.get('capatmax'))
-                    if ppc is not None: item['pointsPerCorrect'] = ppc
-                    if ppw is not None: item['penaltyPerWrong'] = ppw
-                    if cam is not None: item['capAtMax'] = bool(cam)
-
-            elif typ == 'fib':
-                acc = split_list(nrow.get('accept'))
-                if acc: item['accept'] = acc
-                cs = as_bool(nrow.get('casesensitive'))
-                if cs is not None: item['caseSensitive'] = bool(cs)
-                ph = nrow.get('placeholder') or ''
-                if ph: item['placeholder'] = ph
-
-            elif typ in ('fr','free','free_response'):
-                mx = as_int(nrow.get('maxlen'), None)
-                if mx is not None: item['maxLen'] = mx
-                ph = nrow.get('placeholder') or ''
-                if ph: item['placeholder'] = ph
-                # by convention, free response is unscored unless explicitly given points
+            handler = _ITEM_HANDLERS.get(typ)
+            if handler is not None:
+                handler(nrow, item, choice_cols)
 
             # Add to quiz
-            quizzes[qid]["items"].append(item)
+            quiz["items"].append(item)
 
         # finalize and write files
         outdir = Path(args.out)
         outdir.mkdir(parents=True, exist_ok=True)
-        wrote = 0
+        pending = []  # (out_path, payload) written together below
         for qid, q in quizzes.items():
-            meta = quiz_meta.get(qid, {})
+            meta = q.pop('_meta')
             # videoId is required
             if not meta.get('videoId'):
                 print(f"[ERR] Quiz '{qid}' missing videoId; skipping.", file=sys.stderr)
                 continue
             # merge meta into quiz
             q.update(meta)
-            # sort items by t then id for stability
-            q['items'] = sorted(q['items'], key=lambda it: (it.get('t', 0), str(it.get('id'))))
-            js = json.dumps(q, ensure_ascii=False, indent=2)
+            # sort items by t then id for stability (decorated: the original
+            # index breaks ties, so equal keys keep their order and dicts are never compared)
+            keyed = [(it.get('t', 0), str(it.get('id')), n, it) for n, it in enumerate(q['items'])]
+            keyed.sort()
+            q['items'] = [k[3] for k in keyed]
+            js = _dump_quiz_json(q)
             if args.dry_run:
-                print(f"\n=== {qid}.json ===\n{js}\n")
+                print(f"\n=== {qid}.json ===\n{js.decode('utf-8')}")
             else:
-                out_path = outdir / f"{qid}.json"
-                out_path.write_text(js, encoding='utf-8')
-                wrote += 1
+                pending.append((outdir / f"{qid}.json", js))
+        # one file per quiz: overlap the open/write/close latency across threads
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(32, len(pending))) as ex:
+                list(ex.map(lambda pw: pw[0].write_bytes(pw[1]), pending))
+        wrote = len(pending)
         if not args.dry_run:
             print(f"Wrote {wrote} quiz file(s) to {outdir.resolve()}")
         else:
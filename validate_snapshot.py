@@ -29,10 +29,16 @@
 # and (optionally) live API endpoints if you pass --url http://host:port
 
 import argparse, json, os, re, sqlite3, sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from urllib.request import urlopen, Request
 from urllib.error import URLError, HTTPError
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 ROOT = Path(__file__).resolve().parent
 DEFAULT_MANIFEST = ROOT / "mcq-manifest.json"
 
@@ -50,7 +56,7 @@ ERR = "\x1b[31m✖\x1b[0m"
 def load_manifest(path: Path):
     if path.exists():
         try:
-            return json.loads(path.read_text(encoding="utf-8"))
+            return _json_loads(path.read_bytes())
         except Exception as e:
             msg(WARN, f"manifest parse failed ({path}): {e}")
     # sensible defaults matching our snapshot
@@ -98,12 +104,20 @@ def check_html_ids(html_path: Path, required_ids, errors):
     if not html_path.exists():
         msg(WARN, f"skip id check (no file): {html_path}")
         return
-    txt = read_text(html_path)
-    missing = []
-    for idv in required_ids or []:
-        # lax check: look for id="idv"
-        if not re.search(fr'id\s*=\s*["\']{re.escape(idv)}["\']', txt):
-            missing.append(idv)
+    # scan the raw bytes: the id="..." syntax is ASCII, so there is no need
+    # to decode the whole page; ids are encoded to UTF-8 to match
+    data = read_bytes(html_path)
+    required_ids = list(required_ids or [])
+    encoded = {idv: idv.encode("utf-8") for idv in required_ids}
+    # fast path: an id that is not even a substring cannot be present, and
+    # the substring test is far cheaper than the regex
+    candidates = [encoded[idv] for idv in required_ids if encoded[idv] in data]
+    found = set()
+    if candidates:
+        # lax check: look for id="idv"; one alternation scans the file once
+        pat = re.compile(rb'id\s*=\s*["\'](' + b'|'.join(map(re.escape, candidates)) + rb')["\']')
+        found = set(pat.findall(data))
+    missing = [idv for idv in required_ids if encoded[idv] not in found]
     if missing:
         msg(WARN, f"{html_path.name}: missing element IDs: {', '.join(missing)}")
     else:
@@ -116,70 +130,186 @@ def check_html_ids(html_path: Path, required_ids, errors):
 # ======================================================================
 """Validate quiz JSON structure and content."""
 
-def load_quiz(path: Path, errors):
+def load_quiz(path: Path, errors, out=None):
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = _json_loads(path.read_bytes())
         return data
     except Exception as e:
-        msg(ERR, f"quiz JSON invalid: {path.name}: {e}")
+        msg(ERR, f"quiz JSON invalid: {path.name}: {e}", out)
         errors.append(f"quiz invalid: {path}")
         return None
 
 ALLOWED_TYPES = {"pause","mcq","checkbox","poll","fr","free","free_response","fib"}
 
-def validate_quiz_schema(q: dict, name: str, errors):
+
+# type-specific checks: (name, it_id, typ, get, out) -> False on a blocking problem
+def _check_choice_item(name, it_id, typ, g, out):
+    ok = True
+    if not g("choices"):
+        msg(ERR, f"{name}:{it_id}: {typ} without choices", out); ok=False
+    if not g("correct"):
+        msg(ERR, f"{name}:{it_id}: {typ} without correct[]", out); ok=False
+    return ok
+
+
+def _check_poll(name, it_id, typ, g, out):
+    if g("points", 0):
+        msg(WARN, f"{name}:{it_id}: poll has points ({g('points')}); polls are typically unscored", out)
+    return True
+
+
+def _check_fr(name, it_id, typ, g, out):
+    mx = g("maxLen")
+    if mx is not None and not isinstance(mx, int):
+        msg(WARN, f"{name}:{it_id}: fr.maxLen should be integer", out)
+    if g("points", 0):
+        msg(WARN, f"{name}:{it_id}: free-response has points; usually unscored", out)
+    return True
+
+
+_ITEM_CHECKS = {
+    "mcq": _check_choice_item,
+    "checkbox": _check_choice_item,
+    "poll": _check_poll,
+    "fr": _check_fr,
+    "free": _check_fr,
+    "free_response": _check_fr,
+}
+
+
+def validate_quiz_schema(q: dict, name: str, errors, out=None):
     ok = True
+    flush = out is None
+    if flush:
+        out = []  # buffered; written in one go at the end
     # top-level
     for k in ["videoId","items"]:
         if k not in q:
-            msg(ERR, f"{name}: missing top-level field '{k}'")
+            msg(ERR, f"{name}: missing top-level field '{k}'", out)
             errors.append(f"{name}: missing {k}")
             ok = False
     # items
     seen_ids = set()
     for i, it in enumerate(q.get("items", [])):
-        it_id = str(it.get("id", f"#idx{i}"))
+        g = it.get
+        it_id = str(g("id", f"#idx{i}"))
         if it_id in seen_ids:
-            msg(WARN, f"{name}: duplicate item id '{it_id}'")
+            msg(WARN, f"{name}: duplicate item id '{it_id}'", out)
         seen_ids.add(it_id)
-        typ = str(it.get("type","")).lower()
+        typ = str(g("type","")).lower()
         if typ not in ALLOWED_TYPES:
-            msg(WARN, f"{name}:{it_id}: unknown type '{typ}'")
+            msg(WARN, f"{name}:{it_id}: unknown type '{typ}'", out)
         # timestamp requirement (warn if missing t except for some cases)
         if "t" not in it:
-            msg(WARN, f"{name}:{it_id}: missing 't' (timestamp)")
+            msg(WARN, f"{name}:{it_id}: missing 't' (timestamp)", out)
         # type-specific checks
-        if typ == "mcq":
-            if not it.get("choices"):
-                msg(ERR, f"{name}:{it_id}: mcq without choices"); ok=False
-            if not it.get("correct"):
-                msg(ERR, f"{name}:{it_id}: mcq without correct[]"); ok=False
-        if typ == "checkbox":
-            if not it.get("choices"):
-                msg(ERR, f"{name}:{it_id}: checkbox without choices"); ok=False
-            if not it.get("correct"):
-                msg(ERR, f"{name}:{it_id}: checkbox without correct[]"); ok=False
-        if typ in ("poll",):
-            if it.get("points", 0):
-                msg(WARN, f"{name}:{it_id}: poll has points ({it.get('points')}); polls are typically unscored")
-        if typ in ("fr","free","free_response"):
-            mx = it.get("maxLen")
-            if mx is not None and not isinstance(mx, int):
-                msg(WARN, f"{name}:{it_id}: fr.maxLen should be integer")
-            if it.get("points", 0):
-                msg(WARN, f"{name}:{it_id}: free-response has points; usually unscored")
+        check = _ITEM_CHECKS.get(typ)
+        if check is not None and not check(name, it_id, typ, g, out):
+            ok = False
     if ok:
-        msg(OK, f"{name}: quiz schema looks good")
+        msg(OK, f"{name}: quiz schema looks good", out)
+    if flush and out:
+        sys.stdout.write("\n".join(out) + "\n")
     return ok
 
 
+# below this many quiz files a process pool costs more than it saves
+_PARALLEL_MIN_QUIZZES = 16
+
+
+def _validate_one(path: Path):
+    """Load and validate one quiz file; returns (output lines, errors)."""
+    out, errors = [], []
+    q = load_quiz(path, errors, out)
+    if q is not None:
+        validate_quiz_schema(q, path.name, errors, out)
+    return out, errors
+
+
+def validate_quizzes(quiz_files, errors, cache=None):
+    """Validate quiz files (in parallel when there are many), reporting in order.
+
+    With a cache (see load_validate_cache), files whose mtime and size are
+    unchanged replay their stored result instead of being re-validated.
+    """
+    files = cache["files"] if cache is not None else {}
+    results = [None] * len(quiz_files)
+    todo = []  # (index, path, signature) still to validate
+    for n, qf in enumerate(quiz_files):
+        sig = _file_sig(qf)
+        hit = files.get(str(qf))
+        if sig is not None and hit is not None and hit.get("sig") == sig:
+            results[n] = (hit["out"], hit["errors"])
+        else:
+            todo.append((n, qf, sig))
+
+    paths = [qf for _, qf, _ in todo]
+    if len(paths) < _PARALLEL_MIN_QUIZZES:
+        fresh = list(map(_validate_one, paths))
+    else:
+        sys.stdout.flush()  # forked workers would otherwise re-flush our pending output
+        with ProcessPoolExecutor() as ex:
+            fresh = list(ex.map(_validate_one, paths, chunksize=8))
+    for (n, qf, sig), res in zip(todo, fresh):
+        results[n] = res
+        if sig is not None:
+            files[str(qf)] = {"sig": sig, "out": res[0], "errors": res[1]}
+
+    if cache is not None:
+        # drop entries for quiz files that no longer exist
+        current = {str(qf) for qf in quiz_files}
+        cache["files"] = {k: v for k, v in files.items() if k in current}
+
+    for out, errs in results:
+        if out:
+            sys.stdout.write("\n".join(out) + "\n")
+        errors.extend(errs)
+
+
+# ======================================================================
+# Validation cache
+# Remember per-file quiz results between runs.
+# ======================================================================
+"""Remember per-file quiz results between runs."""
+
+CACHE_FILE = ROOT / ".validate_cache.json"
+
+
+def _file_sig(path: Path):
+    """[mtime_ns, size] of path, or None if it cannot be stat'ed."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_validate_cache(path: Path = CACHE_FILE):
+    """Load the result cache; it is discarded whenever this script changes."""
+    sig = _file_sig(Path(__file__))
+    try:
+        data = _json_loads(path.read_bytes())
+    except Exception:
+        data = None
+    if not isinstance(data, dict) or data.get("validator") != sig or not isinstance(data.get("files"), dict):
+        return {"validator": sig, "files": {}}
+    return data
+
+
+def save_validate_cache(cache, path: Path = CACHE_FILE):
+    try:
+        path.write_bytes(_json_dumps(cache))
+    except OSError as e:
+        msg(WARN, f"could not write validation cache ({path}): {e}")
+
+
 def try_http_json(url: str, timeout=5):
     try:
         with urlopen(Request(url, headers={"Accept":"application/json"}), timeout=timeout) as r:
             body = r.read()
             ctype = r.headers.get("Content-Type","")
             try:
-                data = json.loads(body.decode("utf-8","ignore"))
+                data = _json_loads(body)
             except Exception:
                 data = None
             return data, r.status, ctype
@@ -204,7 +334,7 @@ def check_db(db_path: Path, errors):
     try:
         cx = sqlite3.connect(db_path)
         cur = cx.execute("PRAGMA table_info(attempts)")
-        cols = [r[1] for r in cur.fetchall()]
+        cols = {r[1] for r in cur.fetchall()}
         required = ["id","quiz_id","viewer","points","max_points","score_percent","created_at"]
         missing = [c for c in required if c not in cols]
         if missing:
@@ -234,9 +364,10 @@ def check_live_api(base_url: str, errors):
         ("/api/responses", False),          # optional
         ("/api/polls/aggregate?quiz_id=sample", False),  # optional
     ]
-    for path, required in tests:
-        url = base + path
-        data, status, _ = try_http_json(url)
+    # probes are independent: issue them together, then report in order
+    with ThreadPoolExecutor(max_workers=len(tests)) as ex:
+        results = list(ex.map(try_http_json, [base + path for path, _ in tests]))
+    for (path, required), (data, status, _) in zip(tests, results):
         if status == 200:
             msg(OK, f"GET {path} → 200")
             if isinstance(data, dict) and data.get('ok') is False:
@@ -262,8 +393,32 @@ def check_live_api(base_url: str, errors):
 # ======================================================================
 """Miscellaneous helpers."""
 
-def msg(kind, text):
-    print(f"{kind} {text}")
+def _json_loads(raw):
+    """Parse JSON from str or bytes, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def msg(kind, text, out=None):
+    """Print a status line, or append it to the out list to print later."""
+    if out is None:
+        print(f"{kind} {text}")
+    else:
+        out.append(f"{kind} {text}")
 
 
 def expect_exists(path: Path, label: str, errors=None):
@@ -286,11 +441,11 @@ def warn_if_missing(path: Path, label: str, errors=None):
     return False
 
 
-def read_text(path: Path):
+def read_bytes(path: Path):
     try:
-        return path.read_text(encoding="utf-8", errors="replace")
+        return path.read_bytes()
     except Exception:
-        return ""
+        return b""
 
 # ======================================================================
 # CLI / entrypoint
@@ -302,6 +457,7 @@ def main():
     ap = argparse.ArgumentParser(description="Validate MCQ project snapshot")
     ap.add_argument("--manifest", default=str(DEFAULT_MANIFEST), help="path to mcq-manifest.json")
     ap.add_argument("--url", default="", help="optional base URL (e.g., http://127.0.0.1:5000) to check live APIs")
+    ap.add_argument("--no-cache", action="store_true", help="re-validate every quiz file, ignoring .validate_cache.json")
     args = ap.parse_args()
 
     errors = []
@@ -358,10 +514,10 @@ def main():
         msg(WARN, f"no quiz JSON files found in {quizzes_dir}")
     else:
         msg(OK, f"{len(quiz_files)} quiz file(s) found")
-    for qf in quiz_files:
-        q = load_quiz(qf, errors)
-        if q is not None:
-            validate_quiz_schema(q, qf.name, errors)
+    cache = None if args.no_cache else load_validate_cache()
+    validate_quizzes(quiz_files, errors, cache)
+    if cache is not None:
+        save_validate_cache(cache)
 
     # 6) DB schema
     check_db(db_path, errors)